@@ -6,11 +6,12 @@ Set TEST_ENV variable to the deployed stack name.
 """
 
 import pytest
-import boto3
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import os
 import time
+import uuid
 from typing import Dict, Any
 
 # Configuration
@@ -19,32 +20,75 @@ USERS_ENDPOINT = f'{API_ENDPOINT}/users'
 ASSETS_ENDPOINT = f'{API_ENDPOINT}/assets'
 
 
-@pytest.fixture
-def test_user_data():
-    """Fixture for test user data"""
+@pytest.fixture(scope='session')
+def http():
+    """Shared HTTP session so tests reuse pooled connections to API Gateway"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    yield session
+    session.close()
+
+
+def _new_user_data() -> Dict[str, Any]:
+    """Build user data with a unique userId"""
+    suffix = f'{int(time.time())}-{uuid.uuid4().hex}'
     return {
-        'userId': f'test-user-{int(time.time())}',
-        'email': f'test-{int(time.time())}@example.com',
+        'userId': f'test-user-{suffix}',
+        'email': f'test-{suffix}@example.com',
         'name': 'Integration Test User'
     }
 
 
-@pytest.fixture
+def _create(http: requests.Session, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """POST a resource and return the request data once it exists"""
+    response = http.post(endpoint, json=data)
+    assert response.status_code in [201, 200]
+    return data
+
+
+@pytest.fixture(scope='session')
+def test_user_data():
+    """Fixture for test user data, shared across the session"""
+    return _new_user_data()
+
+
+@pytest.fixture(scope='session')
 def test_asset_data():
-    """Fixture for test asset data"""
+    """Fixture for test asset data, shared across the session"""
     return {
-        'assetId': f'test-asset-{int(time.time())}',
+        'assetId': f'test-asset-{int(time.time())}-{uuid.uuid4().hex}',
         'fileName': 'test-file.txt',
         'contentType': 'text/plain'
     }
 
 
+@pytest.fixture(scope='session')
+def created_user(http: requests.Session, test_user_data: Dict[str, Any]):
+    """User created once per session for read-only tests"""
+    yield _create(http, USERS_ENDPOINT, test_user_data)
+
+
+@pytest.fixture
+def mutable_user(http: requests.Session):
+    """Freshly created user with its own userId for tests that modify or delete it"""
+    yield _create(http, USERS_ENDPOINT, _new_user_data())
+
+
+@pytest.fixture(scope='session')
+def created_asset(http: requests.Session, test_asset_data: Dict[str, Any]):
+    """Asset created once per session for read-only tests"""
+    yield _create(http, ASSETS_ENDPOINT, test_asset_data)
+
+
+@pytest.mark.xdist_group('users')
 class TestUsersAPI:
     """Integration tests for Users API"""
     
-    def test_create_user(self, test_user_data: Dict[str, Any]):
+    def test_create_user(self, http: requests.Session, test_user_data: Dict[str, Any]):
         """Test creating a user"""
-        response = requests.post(
+        response = http.post(
             USERS_ENDPOINT,
             json=test_user_data
         )
@@ -53,59 +97,36 @@ class TestUsersAPI:
         data = response.json()
         assert 'user' in data or response.status_code == 200
     
-    def test_create_user_idempotency(self, test_user_data: Dict[str, Any]):
+    def test_create_user_idempotency(self, http: requests.Session, created_user: Dict[str, Any]):
         """Test idempotent user creation"""
-        # First creation
-        response1 = requests.post(
-            USERS_ENDPOINT,
-            json=test_user_data
-        )
-        assert response1.status_code in [201, 200]
-        
         # Second creation (should be idempotent)
-        response2 = requests.post(
+        response2 = http.post(
             USERS_ENDPOINT,
-            json=test_user_data
+            json=created_user
         )
         assert response2.status_code == 200
         assert 'already exists' in response2.json()['message'].lower()
     
-    def test_get_user(self, test_user_data: Dict[str, Any]):
+    def test_get_user(self, http: requests.Session, created_user: Dict[str, Any]):
         """Test retrieving a user"""
-        # Create user first
-        create_response = requests.post(
-            USERS_ENDPOINT,
-            json=test_user_data
-        )
-        assert create_response.status_code in [201, 200]
-        
-        # Get user
-        get_response = requests.get(f'{USERS_ENDPOINT}/{test_user_data["userId"]}')
+        get_response = http.get(f'{USERS_ENDPOINT}/{created_user["userId"]}')
         assert get_response.status_code == 200
         
         data = get_response.json()
-        assert data['userId'] == test_user_data['userId']
-        assert data['email'] == test_user_data['email']
+        assert data['userId'] == created_user['userId']
+        assert data['email'] == created_user['email']
     
-    def test_get_nonexistent_user(self):
+    def test_get_nonexistent_user(self, http: requests.Session):
         """Test retrieving a non-existent user"""
-        response = requests.get(f'{USERS_ENDPOINT}/nonexistent-user-id')
+        response = http.get(f'{USERS_ENDPOINT}/nonexistent-user-id')
         assert response.status_code == 404
         assert 'not found' in response.json()['error'].lower()
     
-    def test_update_user(self, test_user_data: Dict[str, Any]):
+    def test_update_user(self, http: requests.Session, mutable_user: Dict[str, Any]):
         """Test updating a user"""
-        # Create user first
-        create_response = requests.post(
-            USERS_ENDPOINT,
-            json=test_user_data
-        )
-        assert create_response.status_code in [201, 200]
-        
-        # Update user
         updated_data = {'name': 'Updated Name'}
-        update_response = requests.put(
-            f'{USERS_ENDPOINT}/{test_user_data["userId"]}',
+        update_response = http.put(
+            f'{USERS_ENDPOINT}/{mutable_user["userId"]}',
             json=updated_data
         )
         assert update_response.status_code == 200
@@ -113,30 +134,22 @@ class TestUsersAPI:
         data = update_response.json()
         assert data['name'] == 'Updated Name'
     
-    def test_delete_user(self, test_user_data: Dict[str, Any]):
+    def test_delete_user(self, http: requests.Session, mutable_user: Dict[str, Any]):
         """Test deleting a user"""
-        # Create user first
-        create_response = requests.post(
-            USERS_ENDPOINT,
-            json=test_user_data
-        )
-        assert create_response.status_code in [201, 200]
-        
-        # Delete user
-        delete_response = requests.delete(
-            f'{USERS_ENDPOINT}/{test_user_data["userId"]}'
+        delete_response = http.delete(
+            f'{USERS_ENDPOINT}/{mutable_user["userId"]}'
         )
         assert delete_response.status_code == 200
         
         # Verify user is deleted
-        get_response = requests.get(f'{USERS_ENDPOINT}/{test_user_data["userId"]}')
+        get_response = http.get(f'{USERS_ENDPOINT}/{mutable_user["userId"]}')
         assert get_response.status_code == 404
     
-    def test_create_user_missing_fields(self):
+    def test_create_user_missing_fields(self, http: requests.Session):
         """Test creating user with missing required fields"""
         incomplete_data = {'userId': 'test-user'}
         
-        response = requests.post(
+        response = http.post(
             USERS_ENDPOINT,
             json=incomplete_data
         )
@@ -145,12 +158,13 @@ class TestUsersAPI:
         assert 'required' in response.json()['error'].lower()
 
 
+@pytest.mark.xdist_group('assets')
 class TestAssetsAPI:
     """Integration tests for Assets API"""
     
-    def test_create_asset(self, test_asset_data: Dict[str, Any]):
+    def test_create_asset(self, http: requests.Session, test_asset_data: Dict[str, Any]):
         """Test creating an asset"""
-        response = requests.post(
+        response = http.post(
             ASSETS_ENDPOINT,
             json=test_asset_data
         )
@@ -161,35 +175,19 @@ class TestAssetsAPI:
         if response.status_code == 201:
             assert 'uploadUrl' in data
     
-    def test_get_asset(self, test_asset_data: Dict[str, Any]):
+    def test_get_asset(self, http: requests.Session, created_asset: Dict[str, Any]):
         """Test retrieving asset metadata"""
-        # Create asset first
-        create_response = requests.post(
-            ASSETS_ENDPOINT,
-            json=test_asset_data
-        )
-        assert create_response.status_code in [201, 200]
-        
-        # Get asset
-        get_response = requests.get(f'{ASSETS_ENDPOINT}/{test_asset_data["assetId"]}')
+        get_response = http.get(f'{ASSETS_ENDPOINT}/{created_asset["assetId"]}')
         assert get_response.status_code == 200
         
         data = get_response.json()
-        assert data['assetId'] == test_asset_data['assetId']
-        assert data['fileName'] == test_asset_data['fileName']
+        assert data['assetId'] == created_asset['assetId']
+        assert data['fileName'] == created_asset['fileName']
     
-    def test_get_download_url(self, test_asset_data: Dict[str, Any]):
+    def test_get_download_url(self, http: requests.Session, created_asset: Dict[str, Any]):
         """Test getting presigned download URL"""
-        # Create asset first
-        create_response = requests.post(
-            ASSETS_ENDPOINT,
-            json=test_asset_data
-        )
-        assert create_response.status_code in [201, 200]
-        
-        # Get download URL
-        download_response = requests.get(
-            f'{ASSETS_ENDPOINT}/{test_asset_data["assetId"]}/download'
+        download_response = http.get(
+            f'{ASSETS_ENDPOINT}/{created_asset["assetId"]}/download'
         )
         assert download_response.status_code == 200
         
@@ -197,9 +195,9 @@ class TestAssetsAPI:
         assert 'downloadUrl' in data
         assert 'fileName' in data
     
-    def test_get_nonexistent_asset(self):
+    def test_get_nonexistent_asset(self, http: requests.Session):
         """Test retrieving a non-existent asset"""
-        response = requests.get(f'{ASSETS_ENDPOINT}/nonexistent-asset-id')
+        response = http.get(f'{ASSETS_ENDPOINT}/nonexistent-asset-id')
         assert response.status_code == 404
         assert 'not found' in response.json()['error'].lower()
 
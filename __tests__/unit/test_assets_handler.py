@@ -0,0 +1,308 @@
+import json
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../lambda/python')))
+
+from unittest.mock import patch
+from assets_handler import (
+    TABLE_NAME, PRESIGN_CACHE_WINDOW, handler, _presign, _warm_presigner, presigned_url,
+    upload_asset, batch_create_assets, get_assets, get_download_url
+)
+from utils import MAX_BATCH_ITEMS
+from botocore.exceptions import ClientError, NoCredentialsError
+
+
+@pytest.fixture(autouse=True)
+def clear_presign_cache():
+    """Start every test with an empty presigned URL cache"""
+    _presign.cache_clear()
+    yield
+    _presign.cache_clear()
+
+
+@patch('assets_handler.time')
+@patch('assets_handler.s3')
+def test_presigned_url_reused_within_window(mock_s3, mock_time):
+    """Test repeated presign calls in the same window do not re-sign"""
+    mock_time.time.return_value = PRESIGN_CACHE_WINDOW * 10
+    mock_s3.generate_presigned_url.return_value = 'https://signed/1'
+    
+    first = presigned_url('get_object', 'bucket', 'assets/a1/file.txt')
+    mock_time.time.return_value = PRESIGN_CACHE_WINDOW * 10 + PRESIGN_CACHE_WINDOW - 1
+    second = presigned_url('get_object', 'bucket', 'assets/a1/file.txt')
+    
+    assert first == second == 'https://signed/1'
+    mock_s3.generate_presigned_url.assert_called_once_with(
+        'get_object',
+        Params={'Bucket': 'bucket', 'Key': 'assets/a1/file.txt'},
+        ExpiresIn=3600
+    )
+
+
+@patch('assets_handler.time')
+@patch('assets_handler.s3')
+def test_presigned_url_resigned_in_new_window(mock_s3, mock_time):
+    """Test presign calls in a later window produce a fresh signature"""
+    mock_s3.generate_presigned_url.side_effect = ['https://signed/1', 'https://signed/2']
+    
+    mock_time.time.return_value = PRESIGN_CACHE_WINDOW * 10
+    first = presigned_url('get_object', 'bucket', 'assets/a1/file.txt')
+    mock_time.time.return_value = PRESIGN_CACHE_WINDOW * 11
+    second = presigned_url('get_object', 'bucket', 'assets/a1/file.txt')
+    
+    assert first == 'https://signed/1'
+    assert second == 'https://signed/2'
+    assert mock_s3.generate_presigned_url.call_count == 2
+
+
+@patch('assets_handler.s3')
+def test_warm_presigner_ignores_missing_credentials(mock_s3):
+    """Test cold start warm-up signs once and never raises"""
+    mock_s3.generate_presigned_url.side_effect = NoCredentialsError()
+    
+    _warm_presigner()
+    
+    mock_s3.generate_presigned_url.assert_called_once()
+
+
+@patch('assets_handler.s3')
+@patch('assets_handler.ddb')
+def test_get_download_url_projects_presign_fields(mock_ddb, mock_s3):
+    """Test download lookup only reads the fields needed to presign"""
+    mock_ddb.get_item.return_value = {
+        'Item': {
+            's3Bucket': {'S': 'bucket'},
+            's3Key': {'S': 'assets/asset123/file.txt'},
+            'fileName': {'S': 'file.txt'},
+            'contentType': {'S': 'text/plain'}
+        }
+    }
+    mock_s3.generate_presigned_url.return_value = 'https://signed/download'
+    
+    result = get_download_url('asset123')
+    
+    assert result['statusCode'] == 200
+    data = json.loads(result['body'])
+    assert data == {
+        'downloadUrl': 'https://signed/download',
+        'fileName': 'file.txt',
+        'contentType': 'text/plain'
+    }
+    mock_ddb.get_item.assert_called_once_with(
+        TableName=TABLE_NAME,
+        Key={'assetId': {'S': 'asset123'}},
+        ProjectionExpression='s3Bucket, s3Key, fileName, contentType'
+    )
+
+
+@patch('assets_handler.ddb')
+def test_get_download_url_not_found(mock_ddb):
+    """Test download URL for a missing asset"""
+    mock_ddb.get_item.return_value = {}
+    
+    result = get_download_url('nonexistent')
+    
+    assert result['statusCode'] == 404
+
+
+@patch('assets_handler.presigned_url', return_value='https://upload.example.com')
+@patch('assets_handler.time')
+@patch('assets_handler.ddb')
+def test_upload_asset_success(mock_ddb, mock_time, mock_presigned_url):
+    """Test successful asset metadata creation with upload URL"""
+    mock_time.time.return_value = 1000
+    
+    result = upload_asset({'assetId': 'asset123', 'fileName': 'doc.pdf', 'contentType': 'application/pdf'})
+    
+    assert result['statusCode'] == 201
+    data = json.loads(result['body'])
+    assert data['uploadUrl'] == 'https://upload.example.com'
+    
+    call_args = mock_ddb.put_item.call_args
+    assert call_args[1]['ConditionExpression'] == 'attribute_not_exists(assetId)'
+    assert call_args[1]['ReturnValuesOnConditionCheckFailure'] == 'ALL_OLD'
+    assert call_args[1]['TableName'] == TABLE_NAME
+    assert call_args[1]['Item']['createdAt'] == {'N': '1000'}
+    assert call_args[1]['Item']['ttl'] == {'N': str(1000 + 30 * 24 * 60 * 60)}
+    mock_time.time.assert_called_once()
+    mock_presigned_url.assert_called_once_with('put_object', 'b', 'assets/asset123/doc.pdf', 'application/pdf')
+    
+    # Conditional write alone guards idempotency, no preflight read
+    mock_ddb.get_item.assert_not_called()
+
+
+@patch('assets_handler.ddb')
+def test_upload_asset_idempotency(mock_ddb):
+    """Test idempotent asset creation"""
+    existing_asset = {'assetId': {'S': 'asset123'}, 'fileName': {'S': 'doc.pdf'}}
+    mock_ddb.put_item.side_effect = ClientError(
+        {
+            'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'},
+            'Item': existing_asset
+        },
+        'PutItem'
+    )
+    
+    result = upload_asset({'assetId': 'asset123', 'fileName': 'doc.pdf'})
+    
+    assert result['statusCode'] == 200
+    data = json.loads(result['body'])
+    assert data['message'] == 'Asset already exists'
+    assert data['asset'] == {'assetId': 'asset123', 'fileName': 'doc.pdf'}
+    mock_ddb.get_item.assert_not_called()
+
+
+@patch('assets_handler.ddb')
+def test_upload_asset_idempotency_without_old_item(mock_ddb):
+    """Test idempotent asset creation reads the existing asset when ALL_OLD is not returned"""
+    mock_ddb.put_item.side_effect = ClientError(
+        {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}},
+        'PutItem'
+    )
+    mock_ddb.get_item.return_value = {'Item': {'assetId': {'S': 'asset123'}, 'fileName': {'S': 'doc.pdf'}}}
+    
+    result = upload_asset({'assetId': 'asset123', 'fileName': 'doc.pdf'})
+    
+    assert result['statusCode'] == 200
+    data = json.loads(result['body'])
+    assert data['asset'] == {'assetId': 'asset123', 'fileName': 'doc.pdf'}
+    mock_ddb.get_item.assert_called_once_with(TableName=TABLE_NAME, Key={'assetId': {'S': 'asset123'}})
+
+
+@patch('assets_handler.ddb')
+def test_batch_create_assets_success(mock_ddb):
+    """Test bulk asset creation through BatchWriteItem"""
+    mock_ddb.batch_write_item.return_value = {'UnprocessedItems': {}}
+    body = {
+        'items': [
+            {'assetId': 'asset1', 'fileName': 'one.txt'},
+            {'assetId': 'asset2', 'fileName': 'two.pdf', 'contentType': 'application/pdf'}
+        ]
+    }
+    
+    result = batch_create_assets(body)
+    
+    assert result['statusCode'] == 201
+    data = json.loads(result['body'])
+    assert data['count'] == 2
+    
+    puts = mock_ddb.batch_write_item.call_args[1]['RequestItems'][TABLE_NAME]
+    items = [put['PutRequest']['Item'] for put in puts]
+    assert [item['assetId'] for item in items] == [{'S': 'asset1'}, {'S': 'asset2'}]
+    assert items[0]['contentType'] == {'S': 'application/octet-stream'}
+    assert items[1]['s3Key'] == {'S': 'assets/asset2/two.pdf'}
+    mock_ddb.put_item.assert_not_called()
+
+
+@pytest.mark.parametrize('entry', [
+    1,
+    {'assetId': '', 'fileName': 'one.txt'},
+    {'assetId': 'asset1', 'fileName': None},
+    {'assetId': ['asset1'], 'fileName': 'one.txt'},
+    {'assetId': 1, 'fileName': 'one.txt'}
+])
+@patch('assets_handler.ddb')
+def test_batch_create_assets_invalid_items(mock_ddb, entry):
+    """Test bulk asset creation rejects non-object items and non-string or empty keys"""
+    result = batch_create_assets({'items': [entry]})
+    
+    assert result['statusCode'] == 400
+    mock_ddb.batch_write_item.assert_not_called()
+
+
+@patch('assets_handler.ddb')
+def test_batch_create_assets_too_many_items(mock_ddb):
+    """Test bulk asset creation rejects requests above MAX_BATCH_ITEMS"""
+    items = [{'assetId': f'asset{i}', 'fileName': 'file.txt'} for i in range(MAX_BATCH_ITEMS + 1)]
+    
+    result = batch_create_assets({'items': items})
+    
+    assert result['statusCode'] == 400
+    mock_ddb.batch_write_item.assert_not_called()
+
+
+@patch('assets_handler.ddb')
+def test_batch_create_assets_duplicate_ids(mock_ddb):
+    """Test bulk asset creation counts duplicate assetIds once"""
+    mock_ddb.batch_write_item.return_value = {'UnprocessedItems': {}}
+    body = {'items': [{'assetId': 'asset1', 'fileName': 'one.txt'}, {'assetId': 'asset1', 'fileName': 'two.txt'}]}
+    
+    result = batch_create_assets(body)
+    
+    assert result['statusCode'] == 201
+    data = json.loads(result['body'])
+    assert data['count'] == 1
+
+
+@patch('assets_handler.ddb')
+def test_get_assets_success(mock_ddb):
+    """Test bulk asset retrieval through BatchGetItem"""
+    mock_ddb.batch_get_item.return_value = {
+        'Responses': {TABLE_NAME: [{'assetId': {'S': 'asset1'}, 'fileName': {'S': 'one.txt'}}]},
+        'UnprocessedKeys': {}
+    }
+    
+    result = get_assets('asset1,missing')
+    
+    assert result['statusCode'] == 200
+    data = json.loads(result['body'])
+    assert data['assets'] == [{'assetId': 'asset1', 'fileName': 'one.txt'}]
+    
+    request = mock_ddb.batch_get_item.call_args[1]['RequestItems']
+    assert request[TABLE_NAME]['Keys'] == [{'assetId': {'S': 'asset1'}}, {'assetId': {'S': 'missing'}}]
+
+
+def test_handler_get_download_url():
+    """Test handler routes the download resource to get_download_url"""
+    event = {
+        'httpMethod': 'GET',
+        'resource': '/assets/{id}/download',
+        'path': '/assets/asset123/download',
+        'pathParameters': {'id': 'asset123'},
+        'body': None
+    }
+    
+    with patch('assets_handler.get_download_url') as mock_download:
+        mock_download.return_value = {'statusCode': 200, 'body': '{}'}
+        result = handler(event, None)
+        mock_download.assert_called_once_with('asset123')
+
+
+def test_handler_post_assets_batch():
+    """Test handler routes the batch resource to batch creation"""
+    event = {
+        'httpMethod': 'POST',
+        'resource': '/assets/batch',
+        'path': '/assets/batch',
+        'body': json.dumps({'items': [{'assetId': 'asset1', 'fileName': 'one.txt'}]})
+    }
+    
+    with patch('assets_handler.batch_create_assets') as mock_batch, \
+            patch('assets_handler.upload_asset') as mock_upload:
+        mock_batch.return_value = {'statusCode': 201, 'body': '{}'}
+        handler(event, None)
+        mock_batch.assert_called_once_with({'items': [{'assetId': 'asset1', 'fileName': 'one.txt'}]})
+        mock_upload.assert_not_called()
+
+
+def test_handler_get_asset_with_download_id():
+    """Test GET /assets/download is an asset lookup, not a download"""
+    event = {
+        'httpMethod': 'GET',
+        'resource': '/assets/{id}',
+        'path': '/assets/download',
+        'pathParameters': {'id': 'download'},
+        'body': None
+    }
+    
+    with patch('assets_handler.get_asset') as mock_get, \
+            patch('assets_handler.get_download_url') as mock_download:
+        mock_get.return_value = {'statusCode': 200, 'body': '{}'}
+        result = handler(event, None)
+        mock_get.assert_called_once_with('download')
+        mock_download.assert_not_called()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
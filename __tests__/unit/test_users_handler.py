@@ -1,3 +1,4 @@
+import base64
 import json
 import pytest
 import sys
@@ -5,37 +6,53 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../lambda/python')))
 
 from unittest.mock import patch, MagicMock, call
-from users_handler import handler, get_user, create_user, update_user, delete_user
+from users_handler import TABLE_NAME, handler, get_user, get_users, create_user, batch_create_users, update_user, delete_user
+from utils import MAX_BATCH_ITEMS
 from botocore.exceptions import ClientError
 
 
-@patch('users_handler.table')
+@patch('users_handler.ddb')
 @patch('users_handler.logger')
-def test_get_user_success(mock_logger, mock_table):
+def test_get_user_success(mock_logger, mock_ddb):
     """Test successful user retrieval"""
     user_id = 'user123'
     mock_item = {
-        'userId': user_id,
-        'email': 'test@example.com',
-        'name': 'Test User'
+        'userId': {'S': user_id},
+        'email': {'S': 'test@example.com'},
+        'name': {'S': 'Test User'}
     }
     
-    mock_table.get_item.return_value = {'Item': mock_item}
+    mock_ddb.get_item.return_value = {'Item': mock_item}
     
     result = get_user(user_id)
     
     assert result['statusCode'] == 200
     data = json.loads(result['body'])
     assert data['userId'] == user_id
-    mock_table.get_item.assert_called_once_with(Key={'userId': user_id})
+    mock_ddb.get_item.assert_called_once_with(TableName=TABLE_NAME, Key={'userId': {'S': user_id}})
+
+
+@patch('users_handler.ddb')
+def test_get_user_decimal_attributes(mock_ddb):
+    """Test numeric attributes returned by DynamoDB as Decimal are serialized"""
+    mock_ddb.get_item.return_value = {
+        'Item': {'userId': {'S': 'user123'}, 'createdAt': {'N': '1000'}, 'score': {'N': '1.5'}}
+    }
+    
+    result = get_user('user123')
+    
+    assert result['statusCode'] == 200
+    data = json.loads(result['body'])
+    assert data['createdAt'] == 1000
+    assert data['score'] == 1.5
 
 
-@patch('users_handler.table')
-def test_get_user_not_found(mock_table):
+@patch('users_handler.ddb')
+def test_get_user_not_found(mock_ddb):
     """Test user not found scenario"""
     user_id = 'nonexistent'
     
-    mock_table.get_item.return_value = {}
+    mock_ddb.get_item.return_value = {}
     
     result = get_user(user_id)
     
@@ -44,9 +61,46 @@ def test_get_user_not_found(mock_table):
     assert data['error'] == 'User not found'
 
 
-@patch('users_handler.table')
+@patch('utils.time')
+@patch('users_handler.ddb')
+def test_get_users_retries_unprocessed_keys(mock_ddb, mock_time):
+    """Test bulk retrieval merges responses and retries unprocessed keys"""
+    table_name = 'test-users'
+    
+    with patch('users_handler.TABLE_NAME', table_name):
+        mock_ddb.batch_get_item.side_effect = [
+            {
+                'Responses': {table_name: [{'userId': {'S': 'user1'}}]},
+                'UnprocessedKeys': {table_name: {'Keys': [{'userId': {'S': 'user2'}}]}}
+            },
+            {
+                'Responses': {table_name: [{'userId': {'S': 'user2'}}]},
+                'UnprocessedKeys': {}
+            }
+        ]
+        
+        result = get_users('user1, user2,user1')
+    
+    assert result['statusCode'] == 200
+    data = json.loads(result['body'])
+    assert [user['userId'] for user in data['users']] == ['user1', 'user2']
+    
+    first_request = mock_ddb.batch_get_item.call_args_list[0][1]['RequestItems']
+    assert first_request[table_name]['Keys'] == [{'userId': {'S': 'user1'}}, {'userId': {'S': 'user2'}}]
+    assert mock_ddb.batch_get_item.call_count == 2
+    mock_time.sleep.assert_called_once()
+
+
+def test_get_users_empty_ids():
+    """Test bulk retrieval with no usable IDs"""
+    result = get_users(' , ')
+    
+    assert result['statusCode'] == 400
+
+
+@patch('users_handler.ddb')
 @patch('users_handler.time')
-def test_create_user_success(mock_time, mock_table):
+def test_create_user_success(mock_time, mock_ddb):
     """Test successful user creation"""
     mock_time.time.return_value = 1000
     
@@ -56,9 +110,6 @@ def test_create_user_success(mock_time, mock_table):
         'name': 'Test User'
     }
     
-    # Mock that user doesn't exist
-    mock_table.get_item.return_value = {}
-    
     result = create_user(body)
     
     assert result['statusCode'] == 201
@@ -67,20 +118,35 @@ def test_create_user_success(mock_time, mock_table):
     assert 'user' in data
     
     # Verify put_item was called with correct parameters
-    call_args = mock_table.put_item.call_args
+    call_args = mock_ddb.put_item.call_args
     assert call_args[1]['ConditionExpression'] == 'attribute_not_exists(userId)'
+    assert call_args[1]['ReturnValuesOnConditionCheckFailure'] == 'ALL_OLD'
+    assert call_args[1]['TableName'] == TABLE_NAME
+    assert call_args[1]['Item']['userId'] == {'S': 'user123'}
+    assert call_args[1]['Item']['createdAt'] == {'N': '1000'}
+    assert call_args[1]['Item']['ttl'] == {'N': str(1000 + 90 * 24 * 60 * 60)}
+    mock_time.time.assert_called_once()
+    
+    # Conditional write alone guards idempotency, no preflight read
+    mock_ddb.get_item.assert_not_called()
 
 
-@patch('users_handler.table')
-def test_create_user_idempotency(mock_table):
+@patch('users_handler.ddb')
+def test_create_user_idempotency(mock_ddb):
     """Test idempotent user creation"""
     existing_user = {
-        'userId': 'user123',
-        'email': 'test@example.com'
+        'userId': {'S': 'user123'},
+        'email': {'S': 'test@example.com'}
     }
     
-    # Mock that user already exists
-    mock_table.get_item.return_value = {'Item': existing_user}
+    # Mock that user already exists (conditional write fails with old item)
+    mock_ddb.put_item.side_effect = ClientError(
+        {
+            'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'},
+            'Item': existing_user
+        },
+        'PutItem'
+    )
     
     body = {
         'userId': 'user123',
@@ -92,10 +158,29 @@ def test_create_user_idempotency(mock_table):
     assert result['statusCode'] == 200
     data = json.loads(result['body'])
     assert data['message'] == 'User already exists'
+    assert data['user'] == {'userId': 'user123', 'email': 'test@example.com'}
+    mock_ddb.get_item.assert_not_called()
+
+
+@patch('users_handler.ddb')
+def test_create_user_idempotency_without_old_item(mock_ddb):
+    """Test idempotent user creation reads the existing user when ALL_OLD is not returned"""
+    mock_ddb.put_item.side_effect = ClientError(
+        {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}},
+        'PutItem'
+    )
+    mock_ddb.get_item.return_value = {'Item': {'userId': {'S': 'user123'}, 'email': {'S': 'test@example.com'}}}
+    
+    result = create_user({'userId': 'user123', 'email': 'test@example.com'})
+    
+    assert result['statusCode'] == 200
+    data = json.loads(result['body'])
+    assert data['user'] == {'userId': 'user123', 'email': 'test@example.com'}
+    mock_ddb.get_item.assert_called_once_with(TableName=TABLE_NAME, Key={'userId': {'S': 'user123'}})
 
 
-@patch('users_handler.table')
-def test_create_user_missing_required_fields(mock_table):
+@patch('users_handler.ddb')
+def test_create_user_missing_required_fields(mock_ddb):
     """Test user creation with missing required fields"""
     body = {'userId': 'user123'}  # Missing email
     
@@ -104,28 +189,107 @@ def test_create_user_missing_required_fields(mock_table):
     assert result['statusCode'] == 400
     data = json.loads(result['body'])
     assert 'required' in data['error']
-    mock_table.put_item.assert_not_called()
+    mock_ddb.put_item.assert_not_called()
+
+
+@patch('utils.time')
+@patch('users_handler.ddb')
+def test_batch_create_users_success(mock_ddb, mock_time):
+    """Test bulk user creation through BatchWriteItem"""
+    body = {
+        'items': [
+            {'userId': 'user1', 'email': 'one@example.com', 'name': 'One'},
+            {'userId': 'user2', 'email': 'two@example.com'}
+        ]
+    }
+    unprocessed = {TABLE_NAME: [{'PutRequest': {'Item': {'userId': {'S': 'user2'}}}}]}
+    mock_ddb.batch_write_item.side_effect = [{'UnprocessedItems': unprocessed}, {'UnprocessedItems': {}}]
+    
+    result = batch_create_users(body)
+    
+    assert result['statusCode'] == 201
+    data = json.loads(result['body'])
+    assert data['count'] == 2
+    
+    first_request = mock_ddb.batch_write_item.call_args_list[0][1]['RequestItems'][TABLE_NAME]
+    assert [put['PutRequest']['Item']['userId'] for put in first_request] == [{'S': 'user1'}, {'S': 'user2'}]
+    assert mock_ddb.batch_write_item.call_args_list[1][1]['RequestItems'] == unprocessed
+    mock_time.sleep.assert_called_once()
+    mock_ddb.put_item.assert_not_called()
+
+
+@patch('users_handler.ddb')
+def test_batch_create_users_missing_required_fields(mock_ddb):
+    """Test bulk user creation rejects items without required fields"""
+    body = {'items': [{'userId': 'user1', 'email': 'one@example.com'}, {'userId': 'user2'}]}
+    
+    result = batch_create_users(body)
+    
+    assert result['statusCode'] == 400
+    data = json.loads(result['body'])
+    assert 'email' in data['error']
+    mock_ddb.batch_write_item.assert_not_called()
 
 
-@patch('users_handler.table')
-def test_update_user_success(mock_table):
+@pytest.mark.parametrize('entry', [
+    1,
+    'user1',
+    {'userId': '', 'email': 'one@example.com'},
+    {'userId': 'user1', 'email': None},
+    {'userId': ['user1'], 'email': 'one@example.com'},
+    {'userId': 1, 'email': 'one@example.com'}
+])
+@patch('users_handler.ddb')
+def test_batch_create_users_invalid_items(mock_ddb, entry):
+    """Test bulk user creation rejects non-object items and non-string or empty keys"""
+    result = batch_create_users({'items': [entry]})
+    
+    assert result['statusCode'] == 400
+    mock_ddb.batch_write_item.assert_not_called()
+
+
+@patch('users_handler.ddb')
+def test_batch_create_users_too_many_items(mock_ddb):
+    """Test bulk user creation rejects requests above MAX_BATCH_ITEMS"""
+    items = [{'userId': f'user{i}', 'email': f'{i}@example.com'} for i in range(MAX_BATCH_ITEMS + 1)]
+    
+    result = batch_create_users({'items': items})
+    
+    assert result['statusCode'] == 400
+    mock_ddb.batch_write_item.assert_not_called()
+
+
+@patch('users_handler.ddb')
+def test_batch_create_users_duplicate_ids(mock_ddb):
+    """Test bulk user creation counts duplicate userIds once"""
+    mock_ddb.batch_write_item.return_value = {'UnprocessedItems': {}}
+    body = {
+        'items': [
+            {'userId': 'user1', 'email': 'one@example.com'},
+            {'userId': 'user1', 'email': 'uno@example.com'}
+        ]
+    }
+    
+    result = batch_create_users(body)
+    
+    assert result['statusCode'] == 201
+    data = json.loads(result['body'])
+    assert data['count'] == 1
+    puts = mock_ddb.batch_write_item.call_args[1]['RequestItems'][TABLE_NAME]
+    assert [put['PutRequest']['Item']['email'] for put in puts] == [{'S': 'uno@example.com'}]
+
+
+@patch('users_handler.ddb')
+def test_update_user_success(mock_ddb):
     """Test successful user update"""
     user_id = 'user123'
     body = {'name': 'Updated Name'}
     
-    # Mock existing user
-    mock_table.get_item.return_value = {
-        'Item': {
-            'userId': user_id,
-            'email': 'test@example.com'
-        }
-    }
-    
-    mock_table.update_item.return_value = {
+    mock_ddb.update_item.return_value = {
         'Attributes': {
-            'userId': user_id,
-            'email': 'test@example.com',
-            'name': 'Updated Name'
+            'userId': {'S': user_id},
+            'email': {'S': 'test@example.com'},
+            'name': {'S': 'Updated Name'}
         }
     }
     
@@ -134,15 +298,26 @@ def test_update_user_success(mock_table):
     assert result['statusCode'] == 200
     data = json.loads(result['body'])
     assert data['name'] == 'Updated Name'
+    
+    call_args = mock_ddb.update_item.call_args[1]
+    assert call_args['UpdateExpression'] == 'SET updatedAt = :updatedAt, #f0 = :v0'
+    assert call_args['ExpressionAttributeNames'] == {'#f0': 'name'}
+    assert call_args['Key'] == {'userId': {'S': user_id}}
+    assert call_args['ExpressionAttributeValues'][':v0'] == {'S': 'Updated Name'}
+    assert call_args['ConditionExpression'] == 'attribute_exists(userId)'
+    mock_ddb.get_item.assert_not_called()
 
 
-@patch('users_handler.table')
-def test_update_user_not_found(mock_table):
+@patch('users_handler.ddb')
+def test_update_user_not_found(mock_ddb):
     """Test update of non-existent user"""
     user_id = 'nonexistent'
     body = {'name': 'Updated Name'}
     
-    mock_table.get_item.return_value = {}
+    mock_ddb.update_item.side_effect = ClientError(
+        {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}},
+        'UpdateItem'
+    )
     
     result = update_user(user_id, body)
     
@@ -151,8 +326,8 @@ def test_update_user_not_found(mock_table):
     assert data['error'] == 'User not found'
 
 
-@patch('users_handler.table')
-def test_delete_user_success(mock_table):
+@patch('users_handler.ddb')
+def test_delete_user_success(mock_ddb):
     """Test successful user deletion"""
     user_id = 'user123'
     
@@ -161,7 +336,7 @@ def test_delete_user_success(mock_table):
     assert result['statusCode'] == 200
     data = json.loads(result['body'])
     assert data['message'] == 'User deleted successfully'
-    mock_table.delete_item.assert_called_once_with(Key={'userId': user_id})
+    mock_ddb.delete_item.assert_called_once_with(TableName=TABLE_NAME, Key={'userId': {'S': user_id}})
 
 
 @patch('users_handler.logger')
@@ -192,6 +367,121 @@ def test_handler_get_user():
         mock_get.assert_called_once_with('user123')
 
 
+def test_handler_method_not_allowed():
+    """Test handler rejects unsupported method/route combinations"""
+    event = {
+        'httpMethod': 'DELETE',
+        'path': '/users',
+        'body': None
+    }
+    
+    result = handler(event, None)
+    
+    assert result['statusCode'] == 405
+
+
+@pytest.mark.parametrize('query_params', [None, {'ids': ''}, {'ids': ','}])
+@patch('users_handler.ddb')
+def test_handler_get_users_without_ids(mock_ddb, query_params):
+    """Test GET /users without usable ids is a 400, not a 405"""
+    event = {
+        'httpMethod': 'GET',
+        'resource': '/users',
+        'path': '/users',
+        'queryStringParameters': query_params,
+        'body': None
+    }
+    
+    result = handler(event, None)
+    
+    assert result['statusCode'] == 400
+    data = json.loads(result['body'])
+    assert 'ids must contain at least one' in data['error']
+    mock_ddb.batch_get_item.assert_not_called()
+
+
+def test_handler_post_user_with_ids_query():
+    """Test an ids query string does not change how POST is routed"""
+    event = {
+        'httpMethod': 'POST',
+        'resource': '/users',
+        'path': '/users',
+        'queryStringParameters': {'ids': 'user1'},
+        'body': json.dumps({'userId': 'user123', 'email': 'test@example.com'})
+    }
+    
+    with patch('users_handler.create_user') as mock_create:
+        mock_create.return_value = {'statusCode': 201, 'body': '{}'}
+        result = handler(event, None)
+        mock_create.assert_called_once()
+
+
+def test_handler_get_users():
+    """Test handler routes GET /users?ids=... to bulk retrieval"""
+    event = {
+        'httpMethod': 'GET',
+        'path': '/users',
+        'queryStringParameters': {'ids': 'user1,user2'},
+        'body': None
+    }
+    
+    with patch('users_handler.get_users') as mock_get:
+        mock_get.return_value = {'statusCode': 200, 'body': '{}'}
+        result = handler(event, None)
+        mock_get.assert_called_once_with('user1,user2')
+
+
+def test_handler_get_user_skips_body_parsing():
+    """Test GET requests do not parse the request body"""
+    event = {
+        'httpMethod': 'GET',
+        'path': '/users/user123',
+        'pathParameters': {'id': 'user123'},
+        'body': 'not json'
+    }
+    
+    with patch('users_handler.get_user') as mock_get:
+        mock_get.return_value = {'statusCode': 200, 'body': '{}'}
+        result = handler(event, None)
+        assert result['statusCode'] == 200
+        mock_get.assert_called_once_with('user123')
+
+
+def test_handler_post_user_base64_body():
+    """Test handler decodes base64 encoded request bodies"""
+    payload = {'userId': 'user123', 'email': 'test@example.com'}
+    event = {
+        'httpMethod': 'POST',
+        'path': '/users',
+        'body': base64.b64encode(json.dumps(payload).encode()).decode(),
+        'isBase64Encoded': True
+    }
+    
+    with patch('users_handler.create_user') as mock_create:
+        mock_create.return_value = {'statusCode': 201, 'body': '{}'}
+        result = handler(event, None)
+        mock_create.assert_called_once_with(payload)
+
+
+@pytest.mark.parametrize('raw_body', ['not base64!', '\xe9'])
+def test_handler_post_user_malformed_base64_body(raw_body):
+    """Test handler returns 400 for bodies that are not valid base64"""
+    event = {
+        'httpMethod': 'POST',
+        'path': '/users',
+        'body': raw_body,
+        'isBase64Encoded': True
+    }
+    
+    with patch('users_handler.create_user') as mock_create:
+        result = handler(event, None)
+        mock_create.assert_not_called()
+    
+    assert result['statusCode'] == 400
+    data = json.loads(result['body'])
+    assert data['error'] == 'Invalid JSON'
+
+
 def test_handler_post_user():
     """Test handler with POST request"""
     event = {
@@ -206,6 +496,21 @@ def test_handler_post_user():
         mock_create.assert_called_once()
 
 
+def test_handler_post_users_batch():
+    """Test handler routes POST /users/batch to batch creation"""
+    event = {
+        'httpMethod': 'POST',
+        'resource': '/users/batch',
+        'path': '/users/batch',
+        'body': json.dumps({'items': [{'userId': 'user123', 'email': 'test@example.com'}]})
+    }
+    
+    with patch('users_handler.batch_create_users') as mock_batch:
+        mock_batch.return_value = {'statusCode': 201, 'body': '{}'}
+        result = handler(event, None)
+        mock_batch.assert_called_once()
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
 
@@ -1,23 +1,79 @@
-import json
+import binascii
 import os
+import time
 import boto3
+import orjson
 import structlog
-from typing import Dict, Any
-from botocore.exceptions import ClientError
+from functools import lru_cache
+from typing import Dict, Any, Optional
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from utils import (
+    AWS_CLIENT_CONFIG, BODY_METHODS, METHOD_NOT_ALLOWED, batch_get_items, batch_write_items, configure_logging,
+    deserialize_item, dynamodb_client, json_dumps, parse_body, serialize_item, validate_batch_items
+)
 
 # Initialize clients
-s3 = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['ASSETS_TABLE_NAME'])
+s3 = boto3.client('s3', config=AWS_CLIENT_CONFIG.merge(Config(signature_version='s3v4')))
+ddb = dynamodb_client()
+TABLE_NAME = os.environ['ASSETS_TABLE_NAME']
+configure_logging()
 logger = structlog.get_logger()
 
+
+def _warm_presigner() -> None:
+    """Sign a throwaway URL at cold start so credentials are resolved during init, not on the first request"""
+    try:
+        s3.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': os.environ.get('ASSETS_BUCKET_NAME', 'warmup'), 'Key': 'warmup'},
+            ExpiresIn=60
+        )
+    except BotoCoreError as e:
+        logger.warning("Presigner warm-up failed", error=str(e))
+
+
+_warm_presigner()
+
+
+PRESIGNED_URL_EXPIRY = 3600  # 1 hour
+PRESIGN_CACHE_WINDOW = 300  # Reuse signed URLs for up to 5 minutes
+
+
+@lru_cache(maxsize=1024)
+def _presign(operation: str, bucket: str, key: str, content_type: Optional[str], expiry_bucket: int) -> str:
+    """Generate a presigned URL, cached per PRESIGN_CACHE_WINDOW via expiry_bucket"""
+    params = {'Bucket': bucket, 'Key': key}
+    if content_type:
+        params['ContentType'] = content_type
+    
+    return s3.generate_presigned_url(operation, Params=params, ExpiresIn=PRESIGNED_URL_EXPIRY)
+
+
+def presigned_url(operation: str, bucket: str, key: str, content_type: Optional[str] = None) -> str:
+    """Get a presigned URL valid for at least PRESIGNED_URL_EXPIRY - PRESIGN_CACHE_WINDOW seconds"""
+    return _presign(operation, bucket, key, content_type, int(time.time() // PRESIGN_CACHE_WINDOW))
+
+
+# (method, route) -> handler taking (body, asset_id, query_params)
+_DISPATCH = {
+    ('POST', 'collection'): lambda body, asset_id, params: upload_asset(body),
+    ('POST', 'batch'): lambda body, asset_id, params: batch_create_assets(body),
+    ('GET', 'item'): lambda body, asset_id, params: get_asset(asset_id),
+    ('GET', 'download'): lambda body, asset_id, params: get_download_url(asset_id),
+    ('GET', 'collection'): lambda body, asset_id, params: get_assets(params.get('ids', '')),
+}
+
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler for assets API endpoints
     
     Supports:
     - POST /assets - Upload asset
+    - POST /assets/batch - Create asset metadata in bulk
     - GET /assets/{id} - Get asset metadata
+    - GET /assets?ids=a,b,c - Get metadata for multiple assets
     - GET /assets/{id}/download - Get signed URL for download
     """
     try:
@@ -26,41 +82,44 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         path_params = event.get('pathParameters') or {}
         asset_id = path_params.get('id')
         action = path_params.get('action', '')
+        query_params = event.get('queryStringParameters') or {}
         
         logger.info("Asset request received", path=path, method=method, asset_id=asset_id)
         
-        body = json.loads(event.get('body', '{}'))
-        
-        if method == 'POST':
-            return upload_asset(body)
-        elif method == 'GET' and asset_id:
-            if action == 'download':
-                return get_download_url(asset_id)
-            else:
-                return get_asset(asset_id)
+        if asset_id:
+            # /assets/{id}/download has no {action} parameter, so match the API resource instead
+            is_download = action == 'download' or event.get('resource') == '/assets/{id}/download'
+            route = 'download' if is_download else 'item'
+        elif event.get('resource') == '/assets/batch':
+            route = 'batch'
         else:
-            return {
-                'statusCode': 405,
-                'body': json.dumps({'error': 'Method not allowed'})
-            }
+            route = 'collection'
+        
+        route_handler = _DISPATCH.get((method, route))
+        if route_handler is None:
+            return METHOD_NOT_ALLOWED
+        
+        # Only parse the body for methods that carry one
+        body = parse_body(event) if method in BODY_METHODS else None
+        return route_handler(body, asset_id, query_params)
             
-    except json.JSONDecodeError:
+    except (orjson.JSONDecodeError, binascii.Error):
         logger.error("Invalid JSON in request body")
         return {
             'statusCode': 400,
-            'body': json.dumps({'error': 'Invalid JSON'})
+            'body': json_dumps({'error': 'Invalid JSON'})
         }
     except ClientError as e:
         logger.error("AWS service error", error=str(e))
         return {
             'statusCode': 500,
-            'body': json.dumps({'error': 'Internal server error'})
+            'body': json_dumps({'error': 'Internal server error'})
         }
     except Exception as e:
         logger.error("Unexpected error", error=str(e))
         return {
             'statusCode': 500,
-            'body': json.dumps({'error': 'Internal server error'})
+            'body': json_dumps({'error': 'Internal server error'})
         }
 
 
@@ -73,26 +132,15 @@ def upload_asset(body: Dict[str, Any]) -> Dict[str, Any]:
     if not asset_id or not file_name:
         return {
             'statusCode': 400,
-            'body': json.dumps({'error': 'assetId and fileName are required'})
+            'body': json_dumps({'error': 'assetId and fileName are required'})
         }
     
     logger.info("Creating asset metadata", asset_id=asset_id, file_name=file_name)
     
     try:
-        import time
-        import uuid
-        
         bucket_name = os.environ['ASSETS_BUCKET_NAME']
         s3_key = f"assets/{asset_id}/{file_name}"
-        
-        # Check if asset already exists (idempotency)
-        existing = table.get_item(Key={'assetId': asset_id})
-        if 'Item' in existing:
-            logger.info("Asset already exists", asset_id=asset_id)
-            return {
-                'statusCode': 200,
-                'body': json.dumps({'message': 'Asset already exists', 'asset': existing['Item']})
-            }
+        now = int(time.time())
         
         # Store metadata in DynamoDB
         item = {
@@ -102,29 +150,23 @@ def upload_asset(body: Dict[str, Any]) -> Dict[str, Any]:
             's3Key': s3_key,
             's3Bucket': bucket_name,
             'status': 'pending',
-            'createdAt': int(time.time()),
-            'ttl': int(time.time()) + (30 * 24 * 60 * 60)  # TTL: 30 days
+            'createdAt': now,
+            'ttl': now + (30 * 24 * 60 * 60)  # TTL: 30 days
         }
         
-        response = table.put_item(
-            Item=item,
-            ConditionExpression='attribute_not_exists(assetId)'
+        response = ddb.put_item(
+            TableName=TABLE_NAME,
+            Item=serialize_item(item),
+            ConditionExpression='attribute_not_exists(assetId)',
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
         )
         
         # Generate presigned URL for upload
-        upload_url = s3.generate_presigned_url(
-            'put_object',
-            Params={
-                'Bucket': bucket_name,
-                'Key': s3_key,
-                'ContentType': content_type
-            },
-            ExpiresIn=3600  # 1 hour
-        )
+        upload_url = presigned_url('put_object', bucket_name, s3_key, content_type)
         
         return {
             'statusCode': 201,
-            'body': json.dumps({
+            'body': json_dumps({
                 'message': 'Asset metadata created',
                 'asset': item,
                 'uploadUrl': upload_url
@@ -133,31 +175,80 @@ def upload_asset(body: Dict[str, Any]) -> Dict[str, Any]:
         
     except ClientError as e:
         if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
-            existing = table.get_item(Key={'assetId': asset_id})
-            if 'Item' in existing:
+            logger.info("Asset already exists", asset_id=asset_id)
+            # Existing item is returned with the failed condition check (ALL_OLD);
+            # clients that omit it (e.g. DAX) fall back to a read on the conflict path only
+            existing = e.response.get('Item')
+            if existing is None:
+                existing = ddb.get_item(TableName=TABLE_NAME, Key={'assetId': {'S': asset_id}}).get('Item')
+            if existing is not None:
                 return {
                     'statusCode': 200,
-                    'body': json.dumps({'message': 'Asset already exists', 'asset': existing['Item']})
+                    'body': json_dumps({'message': 'Asset already exists', 'asset': deserialize_item(existing)})
                 }
         raise
 
 
+def batch_create_assets(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Create asset metadata in bulk using BatchWriteItem (no upload URLs)"""
+    items = body.get('items')
+    
+    is_valid, error = validate_batch_items(items, ['assetId', 'fileName'])
+    if not is_valid:
+        return {
+            'statusCode': 400,
+            'body': json_dumps({'error': error})
+        }
+    
+    logger.info("Batch creating asset metadata", count=len(items))
+    
+    try:
+        bucket_name = os.environ['ASSETS_BUCKET_NAME']
+        now = int(time.time())
+        
+        batch = [
+            {
+                'assetId': entry['assetId'],
+                'fileName': entry['fileName'],
+                'contentType': entry.get('contentType', 'application/octet-stream'),
+                's3Key': f"assets/{entry['assetId']}/{entry['fileName']}",
+                's3Bucket': bucket_name,
+                'status': 'pending',
+                'createdAt': now,
+                'ttl': now + (30 * 24 * 60 * 60)  # TTL: 30 days
+            }
+            for entry in items
+        ]
+        
+        # Grouped into 25-item BatchWriteItem requests, unprocessed items are resent
+        written = batch_write_items(ddb, TABLE_NAME, 'assetId', batch)
+        
+        return {
+            'statusCode': 201,
+            'body': json_dumps({'message': 'Asset metadata created', 'count': written})
+        }
+        
+    except ClientError as e:
+        logger.error("DynamoDB batch write error", error=str(e))
+        raise
+
+
 def get_asset(asset_id: str) -> Dict[str, Any]:
     """Get asset metadata"""
     logger.info("Getting asset", asset_id=asset_id)
     
     try:
-        response = table.get_item(Key={'assetId': asset_id})
+        response = ddb.get_item(TableName=TABLE_NAME, Key={'assetId': {'S': asset_id}})
         
         if 'Item' not in response:
             return {
                 'statusCode': 404,
-                'body': json.dumps({'error': 'Asset not found'})
+                'body': json_dumps({'error': 'Asset not found'})
             }
         
         return {
             'statusCode': 200,
-            'body': json.dumps(response['Item'])
+            'body': json_dumps(deserialize_item(response['Item']))
         }
         
     except ClientError as e:
@@ -165,32 +256,54 @@ def get_asset(asset_id: str) -> Dict[str, Any]:
         raise
 
 
+def get_assets(ids_param: str) -> Dict[str, Any]:
+    """Get metadata for multiple assets from a comma-separated list of IDs"""
+    asset_ids = [asset_id.strip() for asset_id in ids_param.split(',') if asset_id.strip()]
+    
+    if not asset_ids:
+        return {
+            'statusCode': 400,
+            'body': json_dumps({'error': 'ids must contain at least one assetId'})
+        }
+    
+    logger.info("Getting assets", count=len(asset_ids))
+    
+    try:
+        assets = batch_get_items(ddb, TABLE_NAME, 'assetId', asset_ids)
+        
+        return {
+            'statusCode': 200,
+            'body': json_dumps({'assets': assets})
+        }
+        
+    except ClientError as e:
+        logger.error("DynamoDB batch get error", error=str(e))
+        raise
+
+
 def get_download_url(asset_id: str) -> Dict[str, Any]:
     """Get presigned URL for downloading asset"""
     logger.info("Getting download URL", asset_id=asset_id)
     
     try:
-        response = table.get_item(Key={'assetId': asset_id})
+        response = ddb.get_item(
+            TableName=TABLE_NAME,
+            Key={'assetId': {'S': asset_id}},
+            ProjectionExpression='s3Bucket, s3Key, fileName, contentType'  # Only fields needed to presign
+        )
         
         if 'Item' not in response:
             return {
                 'statusCode': 404,
-                'body': json.dumps({'error': 'Asset not found'})
+                'body': json_dumps({'error': 'Asset not found'})
             }
         
-        item = response['Item']
-        download_url = s3.generate_presigned_url(
-            'get_object',
-            Params={
-                'Bucket': item['s3Bucket'],
-                'Key': item['s3Key']
-            },
-            ExpiresIn=3600  # 1 hour
-        )
+        item = deserialize_item(response['Item'])
+        download_url = presigned_url('get_object', item['s3Bucket'], item['s3Key'])
         
         return {
             'statusCode': 200,
-            'body': json.dumps({
+            'body': json_dumps({
                 'downloadUrl': download_url,
                 'fileName': item['fileName'],
                 'contentType': item.get('contentType')
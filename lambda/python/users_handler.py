@@ -5,26 +5,45 @@ Created: 2024
 Description: REST API endpoints for user management with idempotency and retry logic
 """
 
-import json
+import binascii
 import os
 import time
-import boto3
+import orjson
 import structlog
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, Tuple
 from botocore.exceptions import ClientError
+from utils import (
+    BODY_METHODS, METHOD_NOT_ALLOWED, batch_get_items, batch_write_items, configure_logging, deserialize_item,
+    dynamodb_client, json_dumps, parse_body, serialize_item, validate_batch_items
+)
 
 # Initialize clients
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['USERS_TABLE_NAME'])
+ddb = dynamodb_client()
+TABLE_NAME = os.environ['USERS_TABLE_NAME']
+configure_logging()
 logger = structlog.get_logger()
 
+# (method, route) -> handler taking (body, user_id, query_params)
+_DISPATCH = {
+    ('GET', 'item'): lambda body, user_id, params: get_user(user_id),
+    ('GET', 'collection'): lambda body, user_id, params: get_users(params.get('ids', '')),
+    ('POST', 'collection'): lambda body, user_id, params: create_user(body),
+    ('POST', 'batch'): lambda body, user_id, params: batch_create_users(body),
+    ('PUT', 'item'): lambda body, user_id, params: update_user(user_id, body),
+    ('DELETE', 'item'): lambda body, user_id, params: delete_user(user_id),
+}
+
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler for users API endpoints
     
     Supports:
     - GET /users/{id} - Get user by ID
+    - GET /users?ids=a,b,c - Get multiple users by ID
     - POST /users - Create user
+    - POST /users/batch - Create users in bulk
     - PUT /users/{id} - Update user
     - DELETE /users/{id} - Delete user
     """
@@ -36,42 +55,43 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         method = http_method
         path = request_path
         path_params = event.get('pathParameters') or {}
-        body = json.loads(event.get('body', '{}'))
+        query_params = event.get('queryStringParameters') or {}
         
         # Extract user ID from path
         user_id = path_params.get('id')
         
-        if method == 'GET' and user_id:
-            return get_user(user_id)
-        elif method == 'POST':
-            return create_user(body)
-        elif method == 'PUT' and user_id:
-            return update_user(user_id, body)
-        elif method == 'DELETE' and user_id:
-            return delete_user(user_id)
+        if user_id:
+            route = 'item'
+        elif event.get('resource') == '/users/batch':
+            route = 'batch'
         else:
-            return {
-                'statusCode': 405,
-                'body': json.dumps({'error': 'Method not allowed'})
-            }
+            route = 'collection'
+        
+        route_handler = _DISPATCH.get((method, route))
+        if route_handler is None:
+            return METHOD_NOT_ALLOWED
+        
+        # Only parse the body for methods that carry one
+        body = parse_body(event) if method in BODY_METHODS else None
+        return route_handler(body, user_id, query_params)
             
-    except json.JSONDecodeError:
+    except (orjson.JSONDecodeError, binascii.Error):
         logger.error("Invalid JSON in request body")
         return {
             'statusCode': 400,
-            'body': json.dumps({'error': 'Invalid JSON'})
+            'body': json_dumps({'error': 'Invalid JSON'})
         }
     except ClientError as e:
         logger.error("DynamoDB error", error=str(e))
         return {
             'statusCode': 500,
-            'body': json.dumps({'error': 'Internal server error'})
+            'body': json_dumps({'error': 'Internal server error'})
         }
     except Exception as e:
         logger.error("Unexpected error", error=str(e))
         return {
             'statusCode': 500,
-            'body': json.dumps({'error': 'Internal server error'})
+            'body': json_dumps({'error': 'Internal server error'})
         }
 
 
@@ -84,19 +104,20 @@ def get_user(user_id: str) -> Dict[str, Any]:
     
     for attempt in range(retries):
         try:
-            response = table.get_item(
-                Key={'userId': user_id}
+            response = ddb.get_item(
+                TableName=TABLE_NAME,
+                Key={'userId': {'S': user_id}}
             )
             
             if 'Item' not in response:
                 return {
                     'statusCode': 404,
-                    'body': json.dumps({'error': 'User not found'})
+                    'body': json_dumps({'error': 'User not found'})
                 }
             
             return {
                 'statusCode': 200,
-                'body': json.dumps(response['Item'])
+                'body': json_dumps(deserialize_item(response['Item']))
             }
         except ClientError as e:
             if attempt < retries - 1:
@@ -105,7 +126,32 @@ def get_user(user_id: str) -> Dict[str, Any]:
                 continue
             raise
     
-    return {'statusCode': 500, 'body': json.dumps({'error': 'Failed to get user'})}
+    return {'statusCode': 500, 'body': json_dumps({'error': 'Failed to get user'})}
+
+
+def get_users(ids_param: str) -> Dict[str, Any]:
+    """Get multiple users from a comma-separated list of IDs"""
+    user_ids = [user_id.strip() for user_id in ids_param.split(',') if user_id.strip()]
+    
+    if not user_ids:
+        return {
+            'statusCode': 400,
+            'body': json_dumps({'error': 'ids must contain at least one userId'})
+        }
+    
+    logger.info("Getting users", count=len(user_ids))
+    
+    try:
+        users = batch_get_items(ddb, TABLE_NAME, 'userId', user_ids)
+        
+        return {
+            'statusCode': 200,
+            'body': json_dumps({'users': users})
+        }
+        
+    except ClientError as e:
+        logger.error("DynamoDB batch get error", error=str(e))
+        raise
 
 
 def create_user(body: Dict[str, Any]) -> Dict[str, Any]:
@@ -116,27 +162,20 @@ def create_user(body: Dict[str, Any]) -> Dict[str, Any]:
     if not user_id or not email:
         return {
             'statusCode': 400,
-            'body': json.dumps({'error': 'userId and email are required'})
+            'body': json_dumps({'error': 'userId and email are required'})
         }
     
     logger.info("Creating user", user_id=user_id, email=email)
     
     try:
-        # Check if user already exists (idempotency)
-        existing = table.get_item(Key={'userId': user_id})
-        if 'Item' in existing:
-            logger.info("User already exists", user_id=user_id)
-            return {
-                'statusCode': 200,
-                'body': json.dumps({'message': 'User already exists', 'user': existing['Item']})
-            }
+        now = int(time.time())
         
         # Create user with conditional write to prevent race conditions
         item = {
             'userId': user_id,
             'email': email,
-            'createdAt': int(time.time()),
-            'ttl': int(time.time()) + (90 * 24 * 60 * 60)  # TTL: 90 days
+            'createdAt': now,
+            'ttl': now + (90 * 24 * 60 * 60)  # TTL: 90 days
         }
         
         # Add optional fields
@@ -145,67 +184,126 @@ def create_user(body: Dict[str, Any]) -> Dict[str, Any]:
         if 'department' in body:
             item['department'] = body['department']
         
-        response = table.put_item(
-            Item=item,
-            ConditionExpression='attribute_not_exists(userId)'  # Conditional write for idempotency
+        response = ddb.put_item(
+            TableName=TABLE_NAME,
+            Item=serialize_item(item),
+            ConditionExpression='attribute_not_exists(userId)',  # Conditional write for idempotency
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
         )
         
         logger.info("User created successfully", user_id=user_id)
         
         return {
             'statusCode': 201,
-            'body': json.dumps({'message': 'User created', 'user': item})
+            'body': json_dumps({'message': 'User created', 'user': item})
         }
         
     except ClientError as e:
         if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
-            logger.info("User already exists (race condition)", user_id=user_id)
-            # Fetch the existing user
-            existing = table.get_item(Key={'userId': user_id})
-            if 'Item' in existing:
+            logger.info("User already exists", user_id=user_id)
+            # Existing item is returned with the failed condition check (ALL_OLD);
+            # clients that omit it (e.g. DAX) fall back to a read on the conflict path only
+            existing = e.response.get('Item')
+            if existing is None:
+                existing = ddb.get_item(TableName=TABLE_NAME, Key={'userId': {'S': user_id}}).get('Item')
+            if existing is not None:
                 return {
                     'statusCode': 200,
-                    'body': json.dumps({'message': 'User already exists', 'user': existing['Item']})
+                    'body': json_dumps({'message': 'User already exists', 'user': deserialize_item(existing)})
                 }
         raise
 
 
-def update_user(user_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
-    """Update user with optimistic locking"""
-    logger.info("Updating user", user_id=user_id)
+def batch_create_users(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Create users in bulk using BatchWriteItem (no idempotency check)"""
+    items = body.get('items')
+    
+    is_valid, error = validate_batch_items(items, ['userId', 'email'])
+    if not is_valid:
+        return {
+            'statusCode': 400,
+            'body': json_dumps({'error': error})
+        }
+    
+    logger.info("Batch creating users", count=len(items))
     
     try:
-        # Get existing user
-        existing = table.get_item(Key={'userId': user_id})
+        now = int(time.time())
+        batch = []
         
-        if 'Item' not in existing:
-            return {
-                'statusCode': 404,
-                'body': json.dumps({'error': 'User not found'})
+        for entry in items:
+            item = {
+                'userId': entry['userId'],
+                'email': entry['email'],
+                'createdAt': now,
+                'ttl': now + (90 * 24 * 60 * 60)  # TTL: 90 days
             }
+            if 'name' in entry:
+                item['name'] = entry['name']
+            if 'department' in entry:
+                item['department'] = entry['department']
+            batch.append(item)
+        
+        # Grouped into 25-item BatchWriteItem requests, unprocessed items are resent
+        written = batch_write_items(ddb, TABLE_NAME, 'userId', batch)
+        
+        logger.info("Users batch created successfully", count=written)
         
+        return {
+            'statusCode': 201,
+            'body': json_dumps({'message': 'Users created', 'count': written})
+        }
+        
+    except ClientError as e:
+        logger.error("DynamoDB batch write error", error=str(e))
+        raise
+
+
+@lru_cache(maxsize=128)
+def _update_expression(fields: Tuple[str, ...]) -> Tuple[str, Dict[str, str]]:
+    """Build (and cache) the SET expression and attribute names for a sorted set of fields"""
+    assignments = ''.join(f", #f{index} = :v{index}" for index in range(len(fields)))
+    names = {f'#f{index}': key for index, key in enumerate(fields)}
+    return f"SET updatedAt = :updatedAt{assignments}", names
+
+
+def update_user(user_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    """Update user with optimistic locking"""
+    logger.info("Updating user", user_id=user_id)
+    
+    try:
         # Build update expression
-        update_expr = "SET updatedAt = :updatedAt"
+        fields = tuple(sorted(key for key in body if key != 'userId'))  # Don't allow changing userId
+        update_expr, expr_names = _update_expression(fields)
         expr_attr = {':updatedAt': int(time.time())}
         
-        for key, value in body.items():
-            if key != 'userId':  # Don't allow changing userId
-                update_expr += f", {key} = :{key}"
-                expr_attr[f':{key}'] = value
+        for index, key in enumerate(fields):
+            expr_attr[f':v{index}'] = body[key]
         
-        response = table.update_item(
-            Key={'userId': user_id},
-            UpdateExpression=update_expr,
-            ExpressionAttributeValues=expr_attr,
-            ReturnValues='ALL_NEW'
-        )
+        update_args = {
+            'TableName': TABLE_NAME,
+            'Key': {'userId': {'S': user_id}},
+            'UpdateExpression': update_expr,
+            'ExpressionAttributeValues': serialize_item(expr_attr),
+            'ConditionExpression': 'attribute_exists(userId)',  # Only update existing users
+            'ReturnValues': 'ALL_NEW'
+        }
+        if expr_names:
+            update_args['ExpressionAttributeNames'] = expr_names
+        
+        response = ddb.update_item(**update_args)
         
         return {
             'statusCode': 200,
-            'body': json.dumps(response['Attributes'])
+            'body': json_dumps(deserialize_item(response['Attributes']))
         }
         
     except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return {
+                'statusCode': 404,
+                'body': json_dumps({'error': 'User not found'})
+            }
         logger.error("DynamoDB update error", error=str(e))
         raise
 
@@ -215,11 +313,11 @@ def delete_user(user_id: str) -> Dict[str, Any]:
     logger.info("Deleting user", user_id=user_id)
     
     try:
-        table.delete_item(Key={'userId': user_id})
+        ddb.delete_item(TableName=TABLE_NAME, Key={'userId': {'S': user_id}})
         
         return {
             'statusCode': 200,
-            'body': json.dumps({'message': 'User deleted successfully'})
+            'body': json_dumps({'message': 'User deleted successfully'})
         }
         
     except ClientError as e:
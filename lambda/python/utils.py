@@ -2,13 +2,77 @@
 Utility functions for Lambda handlers
 """
 
+import base64
+import binascii
+import logging
+import os
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 from functools import wraps
 from typing import Callable, Any, TypeVar, ParamSpec
+import boto3
+import orjson
+import structlog
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.config import Config
 
 P = ParamSpec('P')
 T = TypeVar('T')
 
+_SECS_PER_DAY = 86400
+
+# Upper bound on items per batch create request, keeps the sequential
+# BatchWriteItem calls well inside the Lambda timeout
+MAX_BATCH_ITEMS = 100
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+_logger = structlog.get_logger()
+
+# Shared botocore config for module-level clients, reused across warm invocations
+AWS_CLIENT_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=50,
+    retries={'mode': 'adaptive', 'max_attempts': 5},
+    connect_timeout=1,
+    read_timeout=3
+)
+
+
+def dynamodb_client() -> Any:
+    """
+    Create the low-level DynamoDB client used by the handlers
+    
+    Returns:
+        An AmazonDaxClient when DAX_ENDPOINT is set (write-through cache),
+        otherwise a boto3 DynamoDB client using AWS_CLIENT_CONFIG
+    """
+    if os.environ.get('DAX_ENDPOINT'):
+        from amazondax import AmazonDaxClient
+        return AmazonDaxClient(endpoint_url=os.environ['DAX_ENDPOINT'])
+    return boto3.client('dynamodb', config=AWS_CLIENT_CONFIG)
+
+
+def configure_logging() -> None:
+    """
+    Configure structlog to emit JSON and drop records below LOG_LEVEL
+    
+    Filtered calls (e.g. logger.info with LOG_LEVEL=WARNING) return before any
+    processor runs, so they cost close to nothing.
+    """
+    level = getattr(logging, os.environ.get('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+    structlog.configure(
+        processors=[
+            structlog.processors.add_log_level,
+            structlog.processors.TimeStamper(fmt='iso'),
+            structlog.processors.JSONRenderer()
+        ],
+        wrapper_class=structlog.make_filtering_bound_logger(level),
+        cache_logger_on_first_use=True
+    )
+
 
 def retry_with_backoff(max_retries: int = 3, initial_backoff: float = 0.1):
     """
@@ -21,16 +85,13 @@ def retry_with_backoff(max_retries: int = 3, initial_backoff: float = 0.1):
     def decorator(func: Callable[P, T]) -> Callable[P, T]:
         @wraps(func)
         def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
-            import structlog
-            logger = structlog.get_logger()
-            
             for attempt in range(max_retries):
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
                     if attempt < max_retries - 1:
                         backoff_delay = initial_backoff * (2 ** attempt)
-                        logger.warning(
+                        _logger.warning(
                             "Retrying after error",
                             function=func.__name__,
                             attempt=attempt + 1,
@@ -38,19 +99,76 @@ def retry_with_backoff(max_retries: int = 3, initial_backoff: float = 0.1):
                         )
                         time.sleep(backoff_delay)
                     else:
-                        logger.error(
+                        _logger.error(
                             "Max retries exceeded",
                             function=func.__name__,
                             error=str(e)
                         )
                         raise
             
-            raise Exception("Retry logic failed")
+            assert False, "Retry logic failed"  # Unreachable: final attempt re-raises
         
         return wrapper
     return decorator
 
 
+def _json_default(obj: Any) -> Any:
+    """Serialize types returned by DynamoDB that orjson does not handle natively"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def json_dumps(obj: Any) -> str:
+    """
+    Serialize an object to a JSON string using orjson
+    
+    Args:
+        obj: Object to serialize (Decimal and set values from DynamoDB are supported)
+    
+    Returns:
+        JSON string
+    """
+    return orjson.dumps(obj, default=_json_default).decode()
+
+
+# HTTP methods whose request body is parsed by the handlers
+BODY_METHODS = frozenset({'POST', 'PUT'})
+
+METHOD_NOT_ALLOWED = {
+    'statusCode': 405,
+    'body': json_dumps({'error': 'Method not allowed'})
+}
+
+
+def parse_body(event: dict) -> Any:
+    """
+    Parse the JSON body of an API Gateway proxy event
+    
+    Args:
+        event: API Gateway proxy event (body may be base64 encoded or null)
+    
+    Returns:
+        Parsed body, or an empty dict when the body is missing
+    
+    Raises:
+        orjson.JSONDecodeError: If the body is not valid JSON
+        binascii.Error: If a base64 encoded body cannot be decoded (including
+            non-ASCII input, which base64 reports as a plain ValueError)
+    """
+    raw = event.get('body')
+    if not raw:
+        return {}
+    if event.get('isBase64Encoded'):
+        try:
+            raw = base64.b64decode(raw, validate=True)
+        except ValueError as e:
+            raise binascii.Error(str(e)) from e
+    return orjson.loads(raw)
+
+
 def generate_id(prefix: str = "") -> str:
     """
     Generate a unique ID
@@ -61,7 +179,6 @@ def generate_id(prefix: str = "") -> str:
     Returns:
         Unique ID string
     """
-    import uuid
     id_value = str(uuid.uuid4())
     
     if prefix:
@@ -88,6 +205,37 @@ def validate_required_fields(data: dict, required_fields: list[str]) -> tuple[bo
     return True, ""
 
 
+def validate_batch_items(items: Any, key_fields: list[str]) -> tuple[bool, str]:
+    """
+    Validate the items list of a batch create request
+    
+    Args:
+        items: Value of the request's 'items' field
+        key_fields: Fields every item must carry as non-empty strings
+    
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    if not isinstance(items, list) or not items:
+        return False, "items must be a non-empty list"
+    
+    if len(items) > MAX_BATCH_ITEMS:
+        return False, f"items must contain at most {MAX_BATCH_ITEMS} entries"
+    
+    for entry in items:
+        if not isinstance(entry, dict):
+            return False, "items must be objects"
+        
+        is_valid, error = validate_required_fields(entry, key_fields)
+        if not is_valid:
+            return False, error
+        
+        if not all(isinstance(entry[field], str) and entry[field] for field in key_fields):
+            return False, f"{' and '.join(key_fields)} must be non-empty strings"
+    
+    return True, ""
+
+
 def calculate_ttl(days: int) -> int:
     """
     Calculate TTL timestamp from current time
@@ -98,5 +246,128 @@ def calculate_ttl(days: int) -> int:
     Returns:
         Unix timestamp for TTL
     """
-    return int(time.time()) + (days * 24 * 60 * 60)
+    return int(time.time()) + days * _SECS_PER_DAY
+
+
+def serialize_item(item: dict) -> dict:
+    """
+    Convert plain Python values into a low-level DynamoDB item
+    
+    Args:
+        item: Dictionary of attribute values (e.g. {'userId': 'user123'})
+    
+    Returns:
+        Item in DynamoDB attribute value format
+    """
+    return {key: _serializer.serialize(value) for key, value in item.items()}
+
+
+def deserialize_item(item: dict) -> dict:
+    """
+    Convert a low-level DynamoDB item into plain Python values
+    
+    Args:
+        item: Item in DynamoDB attribute value format (e.g. {'userId': {'S': 'user123'}})
+    
+    Returns:
+        Dictionary of deserialized attribute values
+    """
+    return {key: _deserializer.deserialize(value) for key, value in item.items()}
+
 
+def batch_get_items(
+    client: Any,
+    table_name: str,
+    key_name: str,
+    ids: list[str],
+    chunk_size: int = 100,
+    max_workers: int = 4,
+    max_retries: int = 5,
+    initial_backoff: float = 0.05
+) -> list[dict]:
+    """
+    Fetch items by partition key using parallel BatchGetItem requests
+    
+    Args:
+        client: Low-level boto3 DynamoDB client (thread-safe, unlike resources)
+        table_name: Name of the table to read from
+        key_name: Partition key attribute name
+        ids: Partition key values (duplicates are ignored)
+        chunk_size: Keys per BatchGetItem request (DynamoDB maximum is 100)
+        max_workers: Number of chunks fetched concurrently
+        max_retries: Maximum attempts for unprocessed keys
+        initial_backoff: Initial backoff delay in seconds
+    
+    Returns:
+        List of found items, deserialized; missing keys are omitted
+    """
+    unique_ids = list(dict.fromkeys(ids))
+    chunks = [unique_ids[i:i + chunk_size] for i in range(0, len(unique_ids), chunk_size)]
+    
+    def fetch_chunk(chunk: list[str]) -> list[dict]:
+        items = []
+        request = {table_name: {'Keys': [{key_name: {'S': key}} for key in chunk]}}
+        
+        for attempt in range(max_retries):
+            response = client.batch_get_item(RequestItems=request)
+            items.extend(
+                deserialize_item(item) for item in response.get('Responses', {}).get(table_name, [])
+            )
+            request = response.get('UnprocessedKeys') or {}
+            if not request:
+                return items
+            time.sleep(initial_backoff * (2 ** attempt))
+        
+        raise RuntimeError(f"Unprocessed keys remain after {max_retries} attempts")
+    
+    if len(chunks) <= 1:
+        return fetch_chunk(chunks[0]) if chunks else []
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return [item for items in executor.map(fetch_chunk, chunks) for item in items]
+
+
+def batch_write_items(
+    client: Any,
+    table_name: str,
+    key_name: str,
+    items: list[dict],
+    chunk_size: int = 25,
+    max_retries: int = 5,
+    initial_backoff: float = 0.05
+) -> int:
+    """
+    Put items using BatchWriteItem requests
+    
+    Args:
+        client: Low-level boto3 DynamoDB client
+        table_name: Name of the table to write to
+        key_name: Partition key attribute name
+        items: Items to write; for duplicate keys the last item wins
+        chunk_size: Items per BatchWriteItem request (DynamoDB maximum is 25)
+        max_retries: Maximum attempts for unprocessed items
+        initial_backoff: Initial backoff delay in seconds
+    
+    Returns:
+        Number of items written after collapsing duplicate keys
+    """
+    unique_items = list({item[key_name]: item for item in items}.values())
+    
+    for i in range(0, len(unique_items), chunk_size):
+        request = {
+            table_name: [
+                {'PutRequest': {'Item': serialize_item(item)}}
+                for item in unique_items[i:i + chunk_size]
+            ]
+        }
+        
+        for attempt in range(max_retries):
+            response = client.batch_write_item(RequestItems=request)
+            request = response.get('UnprocessedItems') or {}
+            if not request:
+                break
+            time.sleep(initial_backoff * (2 ** attempt))
+        else:
+            raise RuntimeError(f"Unprocessed items remain after {max_retries} attempts")
+    
+    return len(unique_items)